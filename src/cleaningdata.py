@@ -17,6 +17,10 @@ US_STATES = [
     "SD","TN","TX","UT","VT","VA","WA","WI","WV","WY"
 ]
 
+# Categorical dtype for the state column: groupbys reuse the codes instead of
+# rehashing strings. Alphabetical so sorting matches the plain-string order.
+STATE_DTYPE = pd.CategoricalDtype(categories=sorted(US_STATES))
+
 
 @dataclass(frozen=True)
 class PreprocessConfig:
@@ -115,7 +119,11 @@ def make_clean_state_week(raw_df: pd.DataFrame, cfg: PreprocessConfig) -> pd.Dat
 
 
     if cfg.keep_only_50_states:
-        df = df[df["Geographic aggregation"].isin(US_STATES)].copy()
+        # dictionary-encode once: non-state rows get code -1, which doubles as the filter
+        codes = STATE_DTYPE.categories.get_indexer(df["Geographic aggregation"])
+        keep = codes >= 0
+        df = df.loc[keep]
+        df["Geographic aggregation"] = pd.Categorical.from_codes(codes[keep], dtype=STATE_DTYPE)
 
 
     numeric_cols = CAPACITY_COLS + STRESS_COLS + DISEASE_COLS + REPORTING_COLS
@@ -164,7 +172,7 @@ def make_clean_state_week(raw_df: pd.DataFrame, cfg: PreprocessConfig) -> pd.Dat
     }
 
     state_week = (
-        df.groupby(["Geographic aggregation", "Week Ending Date"], as_index=False)
+        df.groupby(["Geographic aggregation", "Week Ending Date"], as_index=False, sort=False, observed=True)
           .agg(agg_dict)
     )
 
@@ -176,12 +184,11 @@ def make_clean_state_week(raw_df: pd.DataFrame, cfg: PreprocessConfig) -> pd.Dat
     if cfg.missing_strategy == "drop":
         state_week = state_week.dropna()
     elif cfg.missing_strategy == "ffill":
-        state_week[all_numeric] = state_week.groupby("Geographic aggregation")[all_numeric].ffill()
+        state_week[all_numeric] = state_week.groupby("Geographic aggregation", sort=False, observed=True)[all_numeric].ffill()
         state_week = state_week.dropna()
     elif cfg.missing_strategy == "state_median":
-        for col in all_numeric:
-            med = state_week.groupby("Geographic aggregation")[col].transform("median")
-            state_week[col] = state_week[col].fillna(med)
+        meds = state_week.groupby("Geographic aggregation", sort=False, observed=True)[all_numeric].transform("median")
+        state_week[all_numeric] = state_week[all_numeric].fillna(meds)
 
         state_week = state_week.dropna(subset=["Percent ICU Beds Occupied", "Percent Inpatient Beds Occupied"])
     else:
@@ -198,32 +205,28 @@ def make_model_ready(state_week: pd.DataFrame) -> pd.DataFrame:
     - disease totals last week (optional but powerful)
     - rolling 4-week averages (smooth trends)
     """
-    df = state_week.copy()
-
-    df["Week Ending Date"] = pd.to_datetime(df["Week Ending Date"], errors="coerce")
+    # assign() leaves the caller's frame untouched without an explicit full copy
+    df = state_week.assign(**{"Week Ending Date": pd.to_datetime(state_week["Week Ending Date"], errors="coerce")})
     df = df.dropna(subset=["Week Ending Date"])
     df = df.sort_values(["Geographic aggregation", "Week Ending Date"]).reset_index(drop=True)
 
-    grp = df.groupby("Geographic aggregation")
+    grp = df.groupby("Geographic aggregation", sort=False, observed=True)
 
-    df["icu_pct_last_week"] = grp["Percent ICU Beds Occupied"].shift(1)
-    df["inpatient_pct_last_week"] = grp["Percent Inpatient Beds Occupied"].shift(1)
+    stress_cols = ["Percent ICU Beds Occupied", "Percent Inpatient Beds Occupied"]
 
- 
-    for col in [
-        "Total Patients Hospitalized with COVID-19",
-        "Total Patients Hospitalized with Influenza",
-        "Total Patients Hospitalized with RSV",
-        "Total ICU Patients Hospitalized with COVID-19",
-        "Total ICU Patients Hospitalized with Influenza",
-        "Total ICU Patients Hospitalized with RSV",
-    ]:
-        if col in df.columns:
-            df[f"{col}_last_week"] = grp[col].shift(1)
+    # one grouped shift / rolling pass over all columns instead of one per column
+    shift_cols = stress_cols + [c for c in DISEASE_COLS if c in df.columns]
+    shifted = grp[shift_cols].shift(1)
+    shifted.columns = ["icu_pct_last_week", "inpatient_pct_last_week"] + [f"{c}_last_week" for c in shift_cols[2:]]
 
+    # 4-week mean as a difference of running sums (no rolling window / MultiIndex);
+    # stays NaN until a state has 4 weeks of history
+    csum = grp[stress_cols].cumsum()
+    prev = csum.groupby(df["Geographic aggregation"], sort=False, observed=True).shift(4, fill_value=0)
+    rolled = ((csum - prev) / 4).where(grp.cumcount() >= 3, axis=0)
+    rolled.columns = ["icu_pct_4w_avg", "inpatient_pct_4w_avg"]
 
-    df["icu_pct_4w_avg"] = grp["Percent ICU Beds Occupied"].rolling(4).mean().reset_index(level=0, drop=True)
-    df["inpatient_pct_4w_avg"] = grp["Percent Inpatient Beds Occupied"].rolling(4).mean().reset_index(level=0, drop=True)
+    df = pd.concat([df, shifted, rolled], axis=1)
 
  
     df = df.dropna(subset=["icu_pct_last_week", "inpatient_pct_last_week", "icu_pct_4w_avg", "inpatient_pct_4w_avg"]).reset_index(drop=True)
@@ -265,7 +268,10 @@ def main(argv: Optional[list[str]] = None) -> None:
     )
 
 
-    raw_df = pd.read_csv(cfg.raw_csv)
+    # Only parse the columns we keep (header names may carry CDC's trailing spaces)
+    header = pd.read_csv(cfg.raw_csv, nrows=0).columns
+    usecols = [c for c in header if str(c).strip() in COLS_TO_KEEP]
+    raw_df = pd.read_csv(cfg.raw_csv, usecols=usecols, engine="pyarrow", dtype_backend="pyarrow")
     raw_df = _strip_column_names(raw_df)
 
 
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
 
 import joblib
+import numpy as np
 import pandas as pd
 
 
@@ -64,89 +66,128 @@ NEIGHBORS = {
     "WY": ["CO", "ID", "MT", "NE", "SD", "UT"],
 }
 
+# Same map as fixed-shape int8 arrays: NB_MATRIX[STATE_IDX[s]] holds the
+# indices (into STATES) of s's neighbors, padded with -1
+STATES = sorted(NEIGHBORS)
+STATE_IDX = {s: i for i, s in enumerate(STATES)}
+NB_MATRIX = np.full((len(STATES), max(len(nbs) for nbs in NEIGHBORS.values())), -1, dtype=np.int8)
+for _i, _s in enumerate(STATES):
+    NB_MATRIX[_i, : len(NEIGHBORS[_s])] = [STATE_IDX[nb] for nb in NEIGHBORS[_s]]
+del _i, _s
 
-def recommend_action(row: pd.Series) -> str:
+
+def recommend_action(df: pd.DataFrame) -> np.ndarray:
     """
     Portfolio-friendly operational recommendation text.
     Not clinical guidance. This is decision-support language based on forecast signals.
+    Evaluated column-wise over the whole forecast frame.
     """
-    icu = float(row["icu_pct_next_week_pred"])
-    inp = float(row["inpatient_pct_next_week_pred"])
-    risk = int(row["critical_risk_next_week_pred"])
-    proba = float(row["critical_risk_proba"])
-    neighbor = str(row.get("suggested_neighbor_state", "") or "")
-
-    if risk == 1 or (icu >= 85 and inp >= 85):
-        msg = (
+    icu = df["icu_pct_next_week_pred"].to_numpy(dtype=float)
+    inp = df["inpatient_pct_next_week_pred"].to_numpy(dtype=float)
+    risk = df["critical_risk_next_week_pred"].to_numpy(dtype=int)
+    proba = df["critical_risk_proba"].to_numpy(dtype=float)
+    if "suggested_neighbor_state" in df.columns:
+        neighbor = df["suggested_neighbor_state"].fillna("").astype(str).to_numpy(dtype=object)
+    else:
+        neighbor = np.full(len(df), "", dtype=object)
+
+    high = (risk == 1) | ((icu >= 85) & (inp >= 85))
+    moderate = ~high & ((icu >= 80) | (inp >= 85) | (proba >= 0.12))
+
+    msg = np.select(
+        [high, moderate],
+        [
             "HIGH RISK: Increase surge monitoring, review staffing/bed capacity plans, "
-            "and coordinate regionally for potential load balancing."
-        )
-        if neighbor:
-            msg += f" Potential lower-risk neighbor: {neighbor}."
-        return msg
+            "and coordinate regionally for potential load balancing.",
+            "MODERATE: Monitor closely and prepare contingency plans.",
+        ],
+        default="LOW: Normal monitoring.",
+    ).astype(object)
+
+    has_neighbor = neighbor != ""
+    suffix = np.where(
+        has_neighbor & high,
+        " Potential lower-risk neighbor: " + neighbor + ".",
+        np.where(has_neighbor & moderate, " Nearby alternative option: " + neighbor + ".", ""),
+    )
+    return msg + suffix
 
-    if (icu >= 80) or (inp >= 85) or (proba >= 0.12):
-        msg = "MODERATE: Monitor closely and prepare contingency plans."
-        if neighbor:
-            msg += f" Nearby alternative option: {neighbor}."
-        return msg
 
-    return "LOW: Normal monitoring."
+def _best_neighbor_positions(nb_idx: np.ndarray, proba: np.ndarray, icu: np.ndarray, inp: np.ndarray) -> np.ndarray:
+    # Lexicographic argmin: keep the lowest proba, then break ties on ICU, then inpatient
+    valid = nb_idx >= 0
+    safe_idx = np.where(valid, nb_idx, 0)
+    candidates = valid
+    for values in (proba, icu, inp):
+        values = np.where(candidates, values[safe_idx], np.inf)
+        candidates = candidates & (values == values.min(axis=1, keepdims=True))
+    best = np.argmax(candidates, axis=1)
+    return np.where(valid.any(axis=1), nb_idx[np.arange(nb_idx.shape[0]), best], -1)
 
 
-def suggest_neighbor(state: str, lookup: pd.DataFrame) -> str:
+def suggest_neighbor(df: pd.DataFrame) -> np.ndarray:
     """
     Suggest a neighboring state with lower predicted risk probability and lower ICU/inpatient values.
+    Picks, for every row of the forecast frame at once, the neighbor with the lowest risk proba,
+    then lowest ICU, then lowest inpatient ("" when no neighbor has a forecast).
     """
-    if state not in NEIGHBORS:
-        return ""
-    candidates = []
-    for nb in NEIGHBORS[state]:
-        if nb in lookup.index:
-            candidates.append(
-                (
-                    nb,
-                    float(lookup.loc[nb, "critical_risk_proba"]),
-                    float(lookup.loc[nb, "icu_pct_next_week_pred"]),
-                    float(lookup.loc[nb, "inpatient_pct_next_week_pred"]),
-                )
-            )
-    if not candidates:
-        return ""
-    # Choose best neighbor: lowest risk proba, then lowest ICU, then lowest inpatient
-    best = sorted(candidates, key=lambda x: (x[1], x[2], x[3]))[0][0]
-    return best
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate next-week forecasts per state using saved models.")
-    parser.add_argument("--data", type=str, default="data/cleaned/model_ready.csv")
-    parser.add_argument("--models_dir", type=str, default="models")
-    parser.add_argument("--out_dir", type=str, default="data/cleaned")
-    args = parser.parse_args()
-
-    data_path = Path(args.data)
-    models_dir = Path(args.models_dir)
-    out_dir = Path(args.out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-
+    states = df["state"].to_numpy(dtype=object)
+    n = len(states)
+
+    # STATES index -> row position in df (-1 when the state has no forecast row)
+    row_of_state = np.full(len(STATES), -1, dtype=np.int32)
+    row_state_idx = np.array([STATE_IDX.get(s, -1) for s in states], dtype=np.int32)
+    known = row_state_idx >= 0
+    row_of_state[row_state_idx[known][::-1]] = np.flatnonzero(known)[::-1]
+
+    # (n, width) row positions of each row's neighbors, -1 as padding
+    nb_idx = np.full((n, NB_MATRIX.shape[1]), -1, dtype=np.int32)
+    nb_states = NB_MATRIX[row_state_idx[known]]
+    nb_idx[known] = np.where(nb_states >= 0, row_of_state[nb_states], -1)
+
+    best = _best_neighbor_positions(
+        nb_idx,
+        df["critical_risk_proba"].to_numpy(dtype=np.float64),
+        df["icu_pct_next_week_pred"].to_numpy(dtype=np.float64),
+        df["inpatient_pct_next_week_pred"].to_numpy(dtype=np.float64),
+    )
 
-    # Load models + config
+    out = np.full(n, "", dtype=object)
+    has_neighbor = best >= 0
+    out[has_neighbor] = states[best[has_neighbor]]
+    return out
 
-    model_icu = joblib.load(models_dir / "model_icu.joblib")
-    model_inpatient = joblib.load(models_dir / "model_inpatient.joblib")
-    model_critical = joblib.load(models_dir / "model_critical.joblib")
-    model_disease = joblib.load(models_dir / "model_disease.joblib")
 
-    feature_cols = joblib.load(models_dir / "feature_cols.joblib")
+@lru_cache(maxsize=4)
+def load_models(models_dir: Path) -> dict:
+    """
+    Load the saved model bundle once per directory and reuse it across calls
+    (e.g. when forecasting live from the web app). Arrays are memory-mapped so
+    the OS page cache is shared between processes.
+    """
+    models_dir = Path(models_dir)
     meta = joblib.load(models_dir / "meta.joblib")
-    critical_threshold = float(meta.get("critical_threshold", 0.5))
-
-
-    # Load data
+    return {
+        "icu": joblib.load(models_dir / "model_icu.joblib", mmap_mode="r"),
+        "inpatient": joblib.load(models_dir / "model_inpatient.joblib", mmap_mode="r"),
+        "critical": joblib.load(models_dir / "model_critical.joblib", mmap_mode="r"),
+        "disease": joblib.load(models_dir / "model_disease.joblib", mmap_mode="r"),
+        "feature_cols": joblib.load(models_dir / "feature_cols.joblib"),
+        "meta": meta,
+        "critical_threshold": float(meta.get("critical_threshold", 0.5)),
+    }
+
+
+def predict(df: pd.DataFrame, models: dict) -> pd.DataFrame:
+    """
+    Forecast next week for the latest row of every state in a model-ready frame.
+    Returns one row per state, critical first, with neighbor + recommendation columns.
+    """
+    feature_cols = models["feature_cols"]
 
-    df = pd.read_csv(data_path)
+    df = df.copy()
     df["Week Ending Date"] = pd.to_datetime(df["Week Ending Date"])
+    df["Geographic aggregation"] = df["Geographic aggregation"].astype("category")
 
     # Current and forecast weeks
     current_week = df["Week Ending Date"].max()
@@ -155,30 +196,27 @@ def main() -> None:
 
     # Latest row per state
 
-    latest_per_state = (
-        df.sort_values(["Geographic aggregation", "Week Ending Date"])
-        .groupby("Geographic aggregation")
-        .tail(1)
-        .copy()
-    )
+    idx = df.groupby("Geographic aggregation", sort=False, observed=True)["Week Ending Date"].idxmax()
+    latest_per_state = df.loc[idx].copy()
 
     # sanity: ensure all features exist
     missing_features = [c for c in feature_cols if c not in latest_per_state.columns]
     if missing_features:
         raise KeyError(f"Missing required feature columns in data: {missing_features}")
 
-    X_forecast = latest_per_state[feature_cols].copy()
+    # Selected once and shared by all four models; sklearn checks it against the fit-time feature names
+    X_forecast = latest_per_state[feature_cols]
 
 
     # Predict
 
-    icu_pred = model_icu.predict(X_forecast)
-    inpatient_pred = model_inpatient.predict(X_forecast)
+    icu_pred = models["icu"].predict(X_forecast)
+    inpatient_pred = models["inpatient"].predict(X_forecast)
 
-    risk_proba = model_critical.predict_proba(X_forecast)[:, 1]
-    risk_pred = (risk_proba >= critical_threshold).astype(int)
+    risk_proba = models["critical"].predict_proba(X_forecast)[:, 1]
+    risk_pred = (risk_proba >= models["critical_threshold"]).astype(int)
 
-    disease_pred = model_disease.predict(X_forecast)
+    disease_pred = models["disease"].predict(X_forecast)
 
     forecast = pd.DataFrame(
         {
@@ -201,25 +239,60 @@ def main() -> None:
         ascending=[False, False, False],
     ).reset_index(drop=True)
 
-    # Neighbor suggestion requires lookup
-    lookup = forecast_sorted.set_index("state")
-    forecast_sorted["suggested_neighbor_state"] = forecast_sorted["state"].apply(lambda s: suggest_neighbor(s, lookup))
+    # Neighbor suggestion
+    forecast_sorted["suggested_neighbor_state"] = suggest_neighbor(forecast_sorted)
 
     # Recommendation text
-    forecast_sorted["recommendation"] = forecast_sorted.apply(recommend_action, axis=1)
+    forecast_sorted["recommendation"] = recommend_action(forecast_sorted)
+
+    return forecast_sorted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate next-week forecasts per state using saved models.")
+    parser.add_argument("--data", type=str, default="data/cleaned/model_ready.csv")
+    parser.add_argument("--models_dir", type=str, default="models")
+    parser.add_argument("--out_dir", type=str, default="data/cleaned")
+    args = parser.parse_args()
+
+    data_path = Path(args.data)
+    models_dir = Path(args.models_dir)
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+
+    # Load models + data
+
+    models = load_models(models_dir)
+    df = pd.read_csv(data_path)
+
+    forecast_sorted = predict(df, models)
+    current_week = forecast_sorted["current_week"].iloc[0]
+    forecast_week = forecast_sorted["forecast_week"].iloc[0]
+
 
+    # Save outputs (float32 is plenty for percentages/probabilities shown at 1-2 decimals)
 
-    # Save outputs
+    for c in [
+        "icu_pct_next_week_pred",
+        "inpatient_pct_next_week_pred",
+        "critical_risk_proba",
+        "disease_burden_next_week_pred",
+    ]:
+        forecast_sorted[c] = forecast_sorted[c].astype("float32")
 
     out_all = out_dir / "next_week_forecast_enhanced.csv"
     out_critical = out_dir / "next_week_forecast_critical_only_enhanced.csv"
 
     forecast_sorted.to_csv(out_all, index=False)
+    # Binary copy for the web app: keeps dtypes, no CSV/date re-parsing on load
+    forecast_sorted.to_parquet(out_all.with_suffix(".parquet"), engine="pyarrow", compression="zstd", index=False)
     forecast_sorted[forecast_sorted["critical_risk_next_week_pred"] == 1].to_csv(out_critical, index=False)
 
     print(" Current week:", current_week.date())
     print(" Forecast week:", forecast_week.date())
     print(" Saved:", out_all.as_posix())
+    print(" Saved:", out_all.with_suffix(".parquet").as_posix())
     print(" Saved:", out_critical.as_posix())
     print("Critical states:", int((forecast_sorted["critical_risk_next_week_pred"] == 1).sum()))
 
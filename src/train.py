@@ -3,7 +3,7 @@ import joblib
 import pandas as pd
 import numpy as np
 
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.linear_model import LogisticRegression, LinearRegression
 
 
@@ -59,21 +59,22 @@ def main():
     print(" Loading data...")
     df = pd.read_csv(DATA_PATH)
     df["Week Ending Date"] = pd.to_datetime(df["Week Ending Date"])
+    df["Geographic aggregation"] = df["Geographic aggregation"].astype("category")
 
     # Build targets
 
     print(" Building targets...")
 
-    df = df.sort_values(["Geographic aggregation", "Week Ending Date"]).copy()
+    df = df.sort_values(["Geographic aggregation", "Week Ending Date"])
 
     # --- ICU target ---
     df["icu_pct_next_week"] = (
-        df.groupby("Geographic aggregation")["Percent ICU Beds Occupied"].shift(-1)
+        df.groupby("Geographic aggregation", sort=False, observed=True)["Percent ICU Beds Occupied"].shift(-1)
     )
 
     # --- Inpatient target ---
     df["inpatient_pct_next_week"] = (
-        df.groupby("Geographic aggregation")["Percent Inpatient Beds Occupied"].shift(-1)
+        df.groupby("Geographic aggregation", sort=False, observed=True)["Percent Inpatient Beds Occupied"].shift(-1)
     )
 
     # --- Disease burden ---
@@ -84,7 +85,7 @@ def main():
     )
 
     df["disease_burden_next_week"] = (
-        df.groupby("Geographic aggregation")["disease_burden"].shift(-1)
+        df.groupby("Geographic aggregation", sort=False, observed=True)["disease_burden"].shift(-1)
     )
 
     # --- Critical stress label ---
@@ -101,15 +102,16 @@ def main():
         "icu_pct_next_week",
         "inpatient_pct_next_week",
         "disease_burden_next_week"
-    ]).copy()
+    ])
 
   
     # Train/Test split (time-based)
 
     split_date = df["Week Ending Date"].quantile(0.8)
 
-    train = df[df["Week Ending Date"] <= split_date].copy()
+    train = df[df["Week Ending Date"] <= split_date]
 
+    # Fit on a DataFrame so the models keep feature_names_in_ and check column order at predict time
     X_train = train[FEATURE_COLS]
 
     y_icu = train["icu_pct_next_week"]
@@ -124,21 +126,23 @@ def main():
    
     print(" Training models...")
 
-    # ICU model
-    model_icu = RandomForestRegressor(
-        n_estimators=300,
-        max_depth=14,
-        random_state=RANDOM_STATE,
-        n_jobs=-1
+    # ICU model (histogram gradient boosting: binned features, fast fit, small dump)
+    model_icu = HistGradientBoostingRegressor(
+        max_depth=8,
+        max_iter=300,
+        learning_rate=0.05,
+        early_stopping=True,
+        random_state=RANDOM_STATE
     )
     model_icu.fit(X_train, y_icu)
 
     # Inpatient model
-    model_inpatient = RandomForestRegressor(
-        n_estimators=300,
-        max_depth=14,
-        random_state=RANDOM_STATE,
-        n_jobs=-1
+    model_inpatient = HistGradientBoostingRegressor(
+        max_depth=8,
+        max_iter=300,
+        learning_rate=0.05,
+        early_stopping=True,
+        random_state=RANDOM_STATE
     )
     model_inpatient.fit(X_train, y_inpatient)
 
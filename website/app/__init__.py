@@ -1,6 +1,10 @@
 from flask import Flask
+from flask_caching import Cache
 from pathlib import Path
 
+# Rendered-page cache; views key their entries on the forecast file's mtime
+cache = Cache(config={"CACHE_TYPE": "SimpleCache"})
+
 def create_app():
     base_dir = Path(__file__).resolve().parent.parent
 
@@ -11,6 +15,7 @@ def create_app():
     )
 
     app.config["SECRET_KEY"] = "dev"
+    cache.init_app(app)
 
     from .routes import bp
     app.register_blueprint(bp)
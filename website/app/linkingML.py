@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import time
+from functools import lru_cache
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from markupsafe import Markup
 
 FORECAST_PATH = Path(__file__).resolve().parents[2] / "data" / "cleaned" / "next_week_forecast_enhanced.csv"
 
+# Under burst load, trust the last stat() of the forecast file for this long (seconds)
+STAT_TTL_S = 1.0
+_LAST_CHECK: dict[Path, tuple[float, Path, int]] = {}
+
 
 REQUIRED_COLS = [
     "state",
@@ -19,6 +28,22 @@ REQUIRED_COLS = [
     "recommendation",
 ]
 
+# Arrow-backed dtypes for the CSV fallback, matching what the Parquet path yields.
+# Only the text columns get a dtype at read time, since those can never fail to parse
+CSV_DTYPES = {
+    "state": "category",
+    "suggested_neighbor_state": "category",
+    "recommendation": "large_string[pyarrow]",
+}
+
+# Numeric CSV columns are coerced after the read (bad cells -> NA, shown as "N/A")
+CSV_FLOAT_COLS = [
+    "icu_pct_next_week_pred",
+    "inpatient_pct_next_week_pred",
+    "critical_risk_proba",
+    "disease_burden_next_week_pred",
+]
+
 US_STATE_NAMES = {
     "AL": "Alabama","AK": "Alaska","AZ": "Arizona","AR": "Arkansas","CA": "California",
     "CO": "Colorado","CT": "Connecticut","DE": "Delaware","FL": "Florida","GA": "Georgia",
@@ -32,19 +57,80 @@ US_STATE_NAMES = {
     "VA": "Virginia","WA": "Washington","WI": "Wisconsin","WV": "West Virginia","WY": "Wyoming",
 }
 
+# exactly: NY — New York (built once; state_label is hit for every rendered state)
+STATE_LABELS = {code: f"{code} — {name}" for code, name in US_STATE_NAMES.items()}
+
+
 def state_label(code: str) -> str:
-    # exactly: NY — New York
-    return f"{code} — {US_STATE_NAMES.get(code, code)}"
+    label = STATE_LABELS.get(code)
+    return label if label is not None else f"{code} — {code}"
 
 
-def load_forecast(path: Path = FORECAST_PATH) -> pd.DataFrame:
+def _resolve_forecast_path(path: Path) -> Path:
+    # Prefer the Parquet copy written by predict_next_week.py (dtypes preserved)
+    parquet_path = path.with_suffix(".parquet")
+    if parquet_path.exists():
+        return parquet_path
     if not path.exists():
         raise FileNotFoundError(
             f"Forecast file not found: {path.as_posix()}\n"
             "Run: python src/predict_next_week.py"
         )
+    return path
+
 
-    df = pd.read_csv(path)
+def _forecast_version(path: Path) -> tuple[Path, int]:
+    # (resolved file, mtime_ns), re-checked on disk at most once per STAT_TTL_S
+    now = time.monotonic()
+    last = _LAST_CHECK.get(path)
+    if last is not None and now - last[0] < STAT_TTL_S:
+        return last[1], last[2]
+
+    resolved = _resolve_forecast_path(path)
+    mtime_ns = resolved.stat().st_mtime_ns
+    _LAST_CHECK[path] = (now, resolved, mtime_ns)
+    return resolved, mtime_ns
+
+
+def forecast_mtime_ns(path: Path = FORECAST_PATH) -> int:
+    # version stamp of the forecast file the app would load (for cache keys)
+    return _forecast_version(path)[1]
+
+
+def load_forecast(path: Path = FORECAST_PATH) -> pd.DataFrame:
+    path, mtime_ns = _forecast_version(path)
+
+    # Parsed once per file version; callers must treat the frame as read-only
+    return _read_forecast(str(path), mtime_ns)
+
+
+@lru_cache(maxsize=4)
+def _read_forecast(path_str: str, mtime_ns: int) -> pd.DataFrame:
+    path = Path(path_str)
+    if path.suffix == ".parquet":
+        # Arrow -> pandas without re-parsing; only the columns the app uses
+        schema_cols = pq.read_schema(path).names
+        columns = [c for c in REQUIRED_COLS if c in schema_cols]
+        # dictionary-encoded columns map to pandas categoricals, the rest stay Arrow-backed
+        df = pq.read_table(path, columns=columns).to_pandas(
+            types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t)
+        )
+    else:
+        # Header sniff so only the app's columns are parsed, with explicit dtypes
+        # and dates parsed inside the tokenizer pass
+        raw_cols = pd.read_csv(path, nrows=0).columns
+        names = {c.strip(): c for c in raw_cols if c.strip() in REQUIRED_COLS}
+        df = pd.read_csv(
+            path,
+            usecols=list(names.values()),
+            dtype={names[c]: t for c, t in CSV_DTYPES.items() if c in names},
+            parse_dates=[names[c] for c in ["current_week", "forecast_week"] if c in names],
+            date_format="ISO8601",
+            dtype_backend="pyarrow",
+        )
+        for c in CSV_FLOAT_COLS:
+            if c in names:
+                df[names[c]] = pd.to_numeric(df[names[c]], errors="coerce").astype("float32[pyarrow]")
 
     # Standardize column names just in case
     df.columns = [c.strip() for c in df.columns]
@@ -57,42 +143,50 @@ def load_forecast(path: Path = FORECAST_PATH) -> pd.DataFrame:
     else:
         df.attrs["missing_cols"] = []
 
-    # Parse dates if present
-    for c in ["current_week", "forecast_week"]:
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce")
-
-    # Sort by risk if present
-    if "critical_risk_proba" in df.columns:
-        df = df.sort_values("critical_risk_proba", ascending=False)
+    # State codes as categoricals: int codes instead of per-row string objects
+    for c in ["state", "suggested_neighbor_state"]:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
+    # 0/1 critical flag as a compact int8 buffer (both load paths); blank or unparsable
+    # flags count as not critical, "1.0" as critical
+    if "critical_risk_next_week_pred" in df.columns:
+        flag = pd.to_numeric(df["critical_risk_next_week_pred"], errors="coerce")
+        df["critical_risk_next_week_pred"] = flag.fillna(0).astype("int8")
+
+    # state -> plain row dict, built once per file so lookups never touch the frame (first row wins)
+    state_index = _SharedDict()
+    if "state" in df.columns:
+        for rec in df.to_dict(orient="records"):
+            state_index.setdefault(rec["state"], rec)
+    df.attrs["state_index"] = state_index
+
+    # dropdown <option> tags for the index page, rendered once per file (values escaped)
+    option = Markup('<option value="{}">{}</option>')
+    df.attrs["state_options_html"] = Markup("\n").join(
+        option.format(s, state_label(s)) for s in sorted(s for s in state_index if pd.notna(s))
+    )
 
     return df
 
 
+class _SharedDict(dict):
+    # pandas deep-copies attrs on most operations; this read-only index is shared instead
+    def __deepcopy__(self, memo):
+        return self
+
+
 def get_state_row(df: pd.DataFrame, state: str):
-    sub = df[df["state"] == state]
-    if sub.empty:
-        return None
-    return sub.iloc[0]
+    return df.attrs.get("state_index", {}).get(state)
 
 
 def fmt_pct(x):
-    try:
-        return f"{float(x):.1f}%"
-    except Exception:
-        return "N/A"
+    return "N/A" if x is None or pd.isna(x) else f"{x:.1f}%"
 
 
 def fmt_num(x):
-    try:
-        return f"{float(x):.0f}"
-    except Exception:
-        return "N/A"
+    return "N/A" if x is None or pd.isna(x) else f"{x:.0f}"
 
 
 def fmt_proba(x):
-    try:
-        return f"{float(x):.2f}"
-    except Exception:
-        return "N/A"
-
+    return "N/A" if x is None or pd.isna(x) else f"{x:.2f}"
@@ -1,17 +1,49 @@
 from __future__ import annotations
 
-from flask import Blueprint, render_template, request, redirect, url_for
-from .linkingML import load_forecast, get_state_row, fmt_pct, fmt_num, fmt_proba, state_label
+from functools import lru_cache
+
+import numpy as np
+from flask import Blueprint, g, render_template, request, redirect, url_for
+from . import cache
+from .linkingML import load_forecast, forecast_mtime_ns, get_state_row, fmt_pct, fmt_num, fmt_proba, state_label
 
 bp = Blueprint("main", __name__)
 
+
+def _has_state(code) -> bool:
+    # empty neighbor cells come back as "" (Parquet) or NaN (CSV)
+    return isinstance(code, str) and code != ""
+
+
+def _forecast():
+    # one load_forecast() per request, shared by every helper that needs the frame;
+    # lazy so cached page hits never touch it
+    if "df" not in g:
+        g.df = load_forecast()
+    return g.df
+
+
+def _top_n() -> int:
+    n = request.args.get("n", "15")
+    try:
+        return max(5, min(50, int(n)))
+    except Exception:
+        return 15
+
+
+@bp.app_context_processor
+def inject_missing_cols():
+    # fixed per forecast file, so every template gets it here instead of per-view kwargs
+    return {"missing_cols": _forecast().attrs.get("missing_cols", [])}
+
+
 @bp.route("/", methods=["GET"])
+@cache.cached(
+    key_prefix=lambda: f"index:{forecast_mtime_ns()}",
+    unless=lambda: bool(request.args.get("state")),
+)
 def index():
-    df = load_forecast()
-
-    # dropdown values
-    states = sorted(df["state"].dropna().unique().tolist())
-    state_options = [(s, state_label(s)) for s in states]
+    df = _forecast()
 
     # if user selected from dropdown (GET ?state=TX), go to state page
     selected = request.args.get("state")
@@ -20,22 +52,23 @@ def index():
 
     return render_template(
         "index.html",
-        state_options=state_options,
-        missing_cols=df.attrs.get("missing_cols", []),
+        state_options_html=df.attrs.get("state_options_html", ""),
     )
 
     
 
 
-@bp.route("/state/<state>", methods=["GET"])
-def state_page(state: str):
-    df = load_forecast()
+@lru_cache(maxsize=128)
+def _build_state_payload(mtime_ns: int, state: str):
+    # (data, neighbor_data) for one state of one forecast version; None if unknown
+    df = _forecast()
     row = get_state_row(df, state)
     if row is None:
-        return render_template("state.html", not_found=True, state=state)
+        return None
 
+    # rows are plain dicts from the prebuilt state index
     neighbor = row.get("suggested_neighbor_state", None)
-    nrow = get_state_row(df, neighbor) if neighbor else None
+    nrow = get_state_row(df, neighbor) if _has_state(neighbor) else None
 
 
     data = {
@@ -48,7 +81,7 @@ def state_page(state: str):
         "risk_pred": int(row.get("critical_risk_next_week_pred", 0)),
         "disease": fmt_num(row.get("disease_burden_next_week_pred")),
         "recommendation": row.get("recommendation", ""),
-        "neighbor": state_label(neighbor) if neighbor else None,
+        "neighbor": state_label(neighbor) if _has_state(neighbor) else None,
     }
 
     neighbor_data = None
@@ -62,51 +95,58 @@ def state_page(state: str):
             "disease": fmt_num(nrow.get("disease_burden_next_week_pred")),
         }
 
-    return render_template(
-        "state.html",
-        data=data,
-        neighbor_data=neighbor_data,
-        missing_cols=df.attrs.get("missing_cols", []),
-    )
+    return data, neighbor_data
 
 
-@bp.route("/top-risk", methods=["GET"])
-def top_risk():
-    df = load_forecast()
-
-    n = request.args.get("n", "15")
-    try:
-        n = max(5, min(50, int(n)))
-    except Exception:
-        n = 15
-
-
-    top_risks = (
-        df[df["critical_risk_next_week_pred"] == 1]
-          .sort_values("critical_risk_proba", ascending=False)
-          .head(n)
-          .copy()
-    )
-
-
-    top_risks["state_label"] = top_risks["state"].apply(state_label)
-
-    if "suggested_neighbor_state" in top_risks.columns:
-        top_risks["neighbor_label"] = top_risks["suggested_neighbor_state"].apply(state_label)
+@bp.route("/state/<state>", methods=["GET"])
+def state_page(state: str):
+    payload = _build_state_payload(forecast_mtime_ns(), state)
+    if payload is None:
+        return render_template("state.html", not_found=True, state=state)
 
+    data, neighbor_data = payload
+    return render_template("state.html", data=data, neighbor_data=neighbor_data)
 
-    if "icu_pct_next_week_pred" in top_risks.columns:
-        top_risks["icu_pct_next_week_pred"] = top_risks["icu_pct_next_week_pred"].map(lambda x: f"{x:.1f}%")
-    if "inpatient_pct_next_week_pred" in top_risks.columns:
-        top_risks["inpatient_pct_next_week_pred"] = top_risks["inpatient_pct_next_week_pred"].map(lambda x: f"{x:.1f}%")
-    if "critical_risk_proba" in top_risks.columns:
-        top_risks["critical_risk_proba"] = top_risks["critical_risk_proba"].map(lambda x: f"{x:.2f}")
 
-    top_risks_rows = top_risks.to_dict(orient="records")
+@bp.route("/top-risk", methods=["GET"])
+@cache.cached(key_prefix=lambda: f"top_risk:{forecast_mtime_ns()}:{_top_n()}")
+def top_risk():
+    df = _forecast()
+    n = _top_n()
+
+
+    # heap-select the n most likely critical states; no copy, no column mutation
+    critical = df[df["critical_risk_next_week_pred"].astype(bool)]
+    subset = critical.nlargest(n, "critical_risk_proba")
+
+    # one array per column, zipped; skips pandas' per-row tuple machinery.
+    # Display strings go under *_display keys so the numeric columns keep their meaning;
+    # optional columns missing from the file come through as all-NA (rendered "N/A")
+    cols = [
+        "state",
+        "icu_pct_next_week_pred",
+        "inpatient_pct_next_week_pred",
+        "critical_risk_proba",
+        "critical_risk_next_week_pred",
+        "disease_burden_next_week_pred",
+        "suggested_neighbor_state",
+    ]
+    top_risks_rows = [
+        {
+            "state": s,
+            "state_label": state_label(s),
+            "icu_pct_display": fmt_pct(icu),
+            "inpatient_pct_display": fmt_pct(inp),
+            "critical_risk_proba_display": fmt_proba(p),
+            "critical_risk_next_week_pred": flag,
+            "disease_burden_display": fmt_num(dis),
+            "suggested_neighbor_state": nb,
+            "neighbor_label": state_label(nb) if _has_state(nb) else None,
+        }
+        for s, icu, inp, p, flag, dis, nb in zip(*(
+            subset[c].to_numpy() if c in subset.columns else np.full(len(subset), None) for c in cols
+        ))
+    ]
 
-    return render_template(
-        "top_risk.html",
-        top_risks=top_risks_rows,
-        missing_cols=df.attrs.get("missing_cols", []),
-    )
+    return render_template("top_risk.html", top_risks=top_risks_rows)
 